@@ -11,8 +11,11 @@ the combined area of the residential buildings.
 """
 
 
-import matplotlib.pyplot as plt
-from matplotlib.patches import Rectangle
+import os
+import sys
+from dataclasses import dataclass
+
+from google.protobuf.message import DecodeError
 from ortools.sat.python import cp_model
 
 
@@ -35,183 +38,518 @@ UTILITY_Y_START = 30
 UTILITY_Y_SIZE = 5
 UTILITY_Y_END = UTILITY_Y_START + UTILITY_Y_SIZE
 
-model = cp_model.CpModel()
+# Area of the lot that is not floodable
+UNFLOODED_AREA = SIZE_X*SIZE_Y - FLOODABLE_X_SIZE*FLOODABLE_Y_SIZE
+
+# Area of the lot that is neither floodable nor occupied by the utility pole
+UNOBSTRUCTED_AREA = (SIZE_X*SIZE_Y - FLOODABLE_X_SIZE*FLOODABLE_Y_SIZE -
+                     UTILITY_X_SIZE*UTILITY_Y_SIZE)
+
+# Upper bound on the yield. The park is at least as large as the largest building, so at least
+# yield/NUM_BUILDINGS, and the parking lots are at least yield/10. All of them fit in the unflooded
+# area, so yield*(1 + 1/NUM_BUILDINGS + 1/10) <= UNFLOODED_AREA.
+MAX_YIELD = (UNFLOODED_AREA*10*NUM_BUILDINGS) // (10*NUM_BUILDINGS + 10 + NUM_BUILDINGS)
+
+# Time limit of a run in seconds, and the share of it given to maximizing the yield (the rest is
+# given to packing the buildings)
+TIME_LIMIT = 5
+YIELD_TIME_SHARE = 0.8
+
+# Directory of this script, next to which the files below are written
+SCRIPT_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+# Files caching the model and its last solution across runs
+MODEL_CACHE = os.path.join(SCRIPT_DIRECTORY, "lot.pb")
+SOLUTION_CACHE = os.path.join(SCRIPT_DIRECTORY, "lot_solution.pb")
 
+# File to which the plan is saved with --save
+PLOT_FILE = os.path.join(SCRIPT_DIRECTORY, "out.png")
 
-def entity_2d(model, name):
-    """Return a 2D entity.
+# Every area that can be obtained from an X size and a Y size
+AREAS = sorted({x_size*y_size for x_size in range(SIZE_X+1) for y_size in range(SIZE_Y+1)})
 
-    {"X": {"Start": [X starting position],
-           "Size": [length of X],
-           "End": [X ending position],
-           "Interval": [interval variable associated with Start, Size, and End]},
-     "Y": {"Start": [Y starting position],
-           "Size": [length of Y],
-           "End": [Y ending position],
-           "Interval": [interval variable associated with Start, Size, and End]},
-    "Area": [area occupied by the entity]}
+
+@dataclass(slots=True)
+class Entity2D:
+    """A rectangle placed on the lot.
+
+    The intervals are associated with the start, size, and end of each axis. `present` is only
+    defined for optional entities.
     """
-    entity = {"X": {"Start": model.NewIntVar(0, SIZE_X, f"{name}_x_start"),
-                    "Size": model.NewIntVar(0, SIZE_X, f"{name}_x_size"),
-                    "End": model.NewIntVar(0, SIZE_X, f"{name}_x_end")},
-              "Y": {"Start": model.NewIntVar(0, SIZE_Y, f"{name}_y_start"),
-                    "Size": model.NewIntVar(0, SIZE_Y, f"{name}_y_duration"),
-                    "End": model.NewIntVar(0, SIZE_Y, f"{name}_y_end")}}
 
-    entity["X"]["Interval"] = model.NewIntervalVar(entity["X"]["Start"],
-                                                   entity["X"]["Size"],
-                                                   entity["X"]["End"],
-                                                   f"{name}_x_interval")
+    x_start: cp_model.IntVar
+    x_size: cp_model.IntVar
+    x_end: cp_model.IntVar
+    x_interval: cp_model.IntervalVar
+    y_start: cp_model.IntVar
+    y_size: cp_model.IntVar
+    y_end: cp_model.IntVar
+    y_interval: cp_model.IntervalVar
+    area: cp_model.IntVar
+    present: cp_model.IntVar | None = None
+
 
-    entity["Y"]["Interval"] = model.NewIntervalVar(entity["Y"]["Start"],
-                                                   entity["Y"]["Size"],
-                                                   entity["Y"]["End"],
-                                                   f"{name}_y_interval")
+def entity_2d(model, name, min_size=0, max_area=SIZE_X*SIZE_Y, optional=False):
+    """Return a 2D entity whose sides are at least `min_size` and whose area is at most `max_area`.
 
-    entity["Area"] = model.NewIntVar(0, SIZE_X*SIZE_Y, f"{name}_area")
+    An optional entity may be absent, in which case its sizes and its area are 0 and its intervals
+    are ignored by the scheduling constraints.
+    """
+    lowest_size = 0 if optional else min_size
+    x_start = model.NewIntVar(0, SIZE_X-min_size, f"{name}_x_start")
+    x_size = model.NewIntVar(lowest_size, SIZE_X, f"{name}_x_size")
+    x_end = model.NewIntVar(lowest_size, SIZE_X, f"{name}_x_end")
+    y_start = model.NewIntVar(0, SIZE_Y-min_size, f"{name}_y_start")
+    y_size = model.NewIntVar(lowest_size, SIZE_Y, f"{name}_y_size")
+    y_end = model.NewIntVar(lowest_size, SIZE_Y, f"{name}_y_end")
+
+    areas = [area for area in AREAS
+             if min_size*min_size <= area <= max_area or (optional and area == 0)]
+    area = model.NewIntVarFromDomain(cp_model.Domain.FromValues(areas), f"{name}_area")
+
+    if optional:
+        present = model.NewBoolVar(f"{name}_present")
+        x_interval = model.NewOptionalIntervalVar(x_start, x_size, x_end, present,
+                                                  f"{name}_x_interval")
+        y_interval = model.NewOptionalIntervalVar(y_start, y_size, y_end, present,
+                                                  f"{name}_y_interval")
+        for size in (x_size, y_size):
+            model.Add(size >= max(min_size, 1)).OnlyEnforceIf(present)
+            model.Add(size == 0).OnlyEnforceIf(present.Not())
+        model.Add(area == 0).OnlyEnforceIf(present.Not())
+        # An absent entity is pinned to the origin, so that the solver does not branch on its position
+        for position in (x_start, x_end, y_start, y_end):
+            model.Add(position == 0).OnlyEnforceIf(present.Not())
+    else:
+        present = None
+        x_interval = model.NewIntervalVar(x_start, x_size, x_end, f"{name}_x_interval")
+        y_interval = model.NewIntervalVar(y_start, y_size, y_end, f"{name}_y_interval")
 
     # Enforce the size of the area
-    model.AddMultiplicationEquality(entity["Area"], [entity["X"]["Size"],
-                                                     entity["Y"]["Size"]])
-
-    return entity
-
-
-# Building variables
-buildings = {i: entity_2d(model, f"building_{i}")
-             for i in range(NUM_BUILDINGS)}
-
-# Symmetry breaking for buildings
-for i in range(NUM_BUILDINGS-1):
-    model.Add(buildings[i]["Area"] >= buildings[i+1]["Area"])
-
-# Parking lots variables
-parking_lots = {i: entity_2d(model, f"parking_lots_{i}")
-                for i in range(NUM_PARKING_LOTS)}
-
-# Symmetry breaking for parking lots
-model.Add(parking_lots[0]["Area"] >= parking_lots[1]["Area"])
-
-# Park variables
-park = entity_2d(model, "park")
-
-# Floodable interval variable
-floodable_interval = {"X": model.NewIntervalVar(FLOODABLE_X_START,
-                                                FLOODABLE_X_SIZE,
-                                                FLOODABLE_X_END,
-                                                "floodable_interval_x"),
-                      "Y": model.NewIntervalVar(FLOODABLE_Y_START,
-                                                FLOODABLE_Y_SIZE,
-                                                FLOODABLE_Y_END,
-                                                "floodable_interval_y")}
-
-# Utility pole interval variable
-utility_interval = {"X": model.NewIntervalVar(UTILITY_X_START,
-                                              UTILITY_X_SIZE,
-                                              UTILITY_X_END,
-                                              "utility_interval_x"),
-                    "Y": model.NewIntervalVar(UTILITY_Y_START,
-                                              UTILITY_Y_SIZE,
-                                              UTILITY_Y_END,
-                                              "utility_interval_y")}
-
-# The buildings, the parking lots, the park, and the floodable area cannot overlap
-model.AddNoOverlap2D([buildings[i]["X"]["Interval"] for i in range(NUM_BUILDINGS)] +
-                     [parking_lots[i]["X"]["Interval"] for i in range(NUM_PARKING_LOTS)] +
-                     [park["X"]["Interval"]] +
-                     [floodable_interval["X"]],
-                     [buildings[i]["Y"]["Interval"] for i in range(NUM_BUILDINGS)] +
-                     [parking_lots[i]["Y"]["Interval"] for i in range(NUM_PARKING_LOTS)] +
-                     [park["Y"]["Interval"]] +
-                     [floodable_interval["Y"]])
-
-# The utility pole cannot overlap with the buildings
-for i in range(NUM_BUILDINGS):
-    model.AddNoOverlap2D([buildings[i]["X"]["Interval"], utility_interval["X"]],
-                         [buildings[i]["Y"]["Interval"], utility_interval["Y"]])
-
-# The utility pole cannot overlap with the park
-model.AddNoOverlap2D([park["X"]["Interval"], utility_interval["X"]],
-                     [park["Y"]["Interval"], utility_interval["Y"]])
-
-# The combined areas of the parkings must be at least 10% the combined areas of the buildings
-model.Add(cp_model.LinearExpr.Sum([parking_lots[i]["Area"] for i in range(NUM_PARKING_LOTS)]) * 10 >=
-          cp_model.LinearExpr.Sum([buildings[i]["Area"] for i in range(NUM_BUILDINGS)]))
-
-# The area of the park must be at least as large as the area of the largest building
-largest_building = model.NewIntVar(0, SIZE_X*SIZE_Y, "largest_building")
-model.AddMaxEquality(largest_building, [buildings[i]["Area"] for i in range(NUM_BUILDINGS)])
-model.Add(park["Area"] >= largest_building)
-
-# The objective is to maximize the yield (building area)
-lot_yield = model.NewIntVar(0, SIZE_X*SIZE_Y, "lot_yield")
-model.Add(lot_yield == cp_model.LinearExpr.Sum([buildings[i]["Area"] for i in range(NUM_BUILDINGS)]))
-model.Maximize(lot_yield)
+    model.AddMultiplicationEquality(area, [x_size, y_size])
+
+    return Entity2D(x_start, x_size, x_end, x_interval,
+                    y_start, y_size, y_end, y_interval,
+                    area, present)
+
+
+def add_lexicographic_greater_equal(model, left, right, name):
+    """Enforce that the sequence `left` is lexicographically greater than or equal to `right`."""
+    equal_so_far = []
+    for k, (left_value, right_value) in enumerate(zip(left, right)):
+        # If all the previous values are equal, the current value of `left` must not be smaller
+        model.Add(left_value >= right_value).OnlyEnforceIf(equal_so_far)
+
+        if k < len(left)-1:
+            equal = model.NewBoolVar(f"{name}_equal_{k}")
+            model.Add(left_value == right_value).OnlyEnforceIf(equal)
+            model.Add(left_value != right_value).OnlyEnforceIf(equal.Not())
+            equal_so_far = equal_so_far + [equal]
+
+
+def add_no_overlap_with_obstacle(model, entity, x_start, x_end, y_start, y_end, name):
+    """Enforce that `entity` lies to the left of, to the right of, below, or above an obstacle."""
+    sides = {"left": entity.x_end <= x_start,
+             "right": entity.x_start >= x_end,
+             "below": entity.y_end <= y_start,
+             "above": entity.y_start >= y_end}
+
+    literals = []
+    for side, constraint in sides.items():
+        literal = model.NewBoolVar(f"{name}_{side}")
+        model.Add(constraint).OnlyEnforceIf(literal)
+        literals.append(literal)
+
+    # An absent entity does not need to avoid the obstacle
+    if entity.present is not None:
+        literals.append(entity.present.Not())
+
+    model.AddBoolOr(literals)
+
+
+def symmetry_key(entity):
+    """Return the values used to order interchangeable entities."""
+    return [entity.area, entity.x_start, entity.y_start]
+
+
+def greedy_layout():
+    """Return a simple feasible layout, with (X start, Y start, X size, Y size) for each entity.
+
+    All entities are full-height slices of the strip below the floodable area and the utility pole.
+    The buildings and the park share the same width, so that the park is as large as the largest
+    building, and the remaining width goes to the first parking lot. The buildings are placed from
+    right to left to respect symmetry breaking.
+
+    {"buildings": {[building]: [rectangle]},
+     "parking_lots": {[parking lot]: [rectangle]},
+     "park": [rectangle]}
+    """
+    height = min(FLOODABLE_Y_START, UTILITY_Y_START)
+    width = SIZE_X // (NUM_BUILDINGS+2)
+    park_x_start = NUM_BUILDINGS*width
+    parking_x_start = park_x_start + width
+
+    return {"buildings": {i: ((NUM_BUILDINGS-1-i)*width, 0, width, height)
+                          for i in range(NUM_BUILDINGS)},
+            "parking_lots": {i: (parking_x_start, 0, SIZE_X-parking_x_start, height) if i == 0
+                             else (0, 0, 0, 0)
+                             for i in range(NUM_PARKING_LOTS)},
+            "park": (park_x_start, 0, width, height)}
+
+
+def entity_hint(entity, rectangle):
+    """Return the hint placing `entity` on `rectangle` (see `greedy_layout` and `add_hint`)."""
+    x_start, y_start, x_size, y_size = rectangle
+    hint = {entity.x_start.Index(): x_start,
+            entity.x_size.Index(): x_size,
+            entity.x_end.Index(): x_start+x_size,
+            entity.y_start.Index(): y_start,
+            entity.y_size.Index(): y_size,
+            entity.y_end.Index(): y_start+y_size,
+            entity.area.Index(): x_size*y_size}
+    if entity.present is not None:
+        hint[entity.present.Index()] = int(x_size*y_size > 0)
+    return hint
+
+
+def layout_hint(layout, buildings, parking_lots, park):
+    """Return the hint placing every entity as in `layout` (see `greedy_layout` and `add_hint`)."""
+    hint = {}
+    for i, building in buildings.items():
+        hint.update(entity_hint(building, layout["buildings"][i]))
+    for i, parking_lot in parking_lots.items():
+        hint.update(entity_hint(parking_lot, layout["parking_lots"][i]))
+    hint.update(entity_hint(park, layout["park"]))
+    return hint
+
+
+def add_hint(model, hint):
+    """Add `hint`, mapping variable indices to values, to the solution hint of the model.
+
+    The hint is written to the model proto in bulk, instead of one `model.AddHint` call per variable.
+    """
+    solution_hint = model.Proto().solution_hint
+    solution_hint.vars.extend(hint.keys())
+    solution_hint.values.extend(hint.values())
+
+
+def solution_values(response):
+    """Return a function giving the value of a variable in the solution of a solver response.
+
+    The solution is read once from the response, instead of once per variable with `solver.Value`.
+    """
+    solution = response.solution
+    return lambda variable: solution[variable.Index()]
+
+
+def solved_layout(response, buildings, parking_lots, park):
+    """Return the layout of a solver response (see `greedy_layout`)."""
+    value = solution_values(response)
+
+    def rectangle(entity):
+        return (value(entity.x_start),
+                value(entity.y_start),
+                value(entity.x_size),
+                value(entity.y_size))
+
+    return {"buildings": {i: rectangle(building) for i, building in buildings.items()},
+            "parking_lots": {i: rectangle(parking_lot) for i, parking_lot in parking_lots.items()},
+            "park": rectangle(park)}
+
+
+def plot_solution(response, buildings, parking_lots, park, filename=None):
+    """Display the solution, or save it to `filename` without a display if it is given."""
+    import matplotlib
+    if filename is not None:
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from matplotlib.collections import PatchCollection
+    from matplotlib.patches import Rectangle
+
+    fig, ax = plt.subplots()
+    plt.xlim([0, SIZE_X])
+    plt.ylim([0, SIZE_Y])
+
+    layout = solved_layout(response, buildings, parking_lots, park)
+
+    def rectangle(x_start, y_start, x_size, y_size):
+        return Rectangle((x_start, y_start), x_size, y_size)
+
+    # Residential buildings, parking lots, park, floodable area, and utility pole
+    patches = ([rectangle(*layout["buildings"][i]) for i in range(NUM_BUILDINGS)] +
+               [rectangle(*layout["parking_lots"][i]) for i in range(NUM_PARKING_LOTS)] +
+               [rectangle(*layout["park"])] +
+               [rectangle(FLOODABLE_X_START, FLOODABLE_Y_START, FLOODABLE_X_SIZE, FLOODABLE_Y_SIZE)] +
+               [rectangle(UTILITY_X_START, UTILITY_Y_START, UTILITY_X_SIZE, UTILITY_Y_SIZE)])
+    colors = (['royalblue']*NUM_BUILDINGS +
+              ['grey']*NUM_PARKING_LOTS +
+              ['limegreen'] +
+              ['red'] +
+              ['orange'])
+
+    # Draw all the rectangles at once
+    ax.add_collection(PatchCollection(patches, facecolors=colors, edgecolors='black', linewidths=3))
+
+    if filename is None:
+        plt.show()
+    else:
+        fig.savefig(filename, dpi=72)
+
+
+def build_model():
+    """Return the model, the buildings, the parking lots, the park, and the yield variable."""
+    model = cp_model.CpModel()
+
+    # Building variables (buildings avoid both the floodable area and the utility pole)
+    buildings = {i: entity_2d(model, f"building_{i}", min_size=1, max_area=UNOBSTRUCTED_AREA,
+                              optional=True)
+                 for i in range(NUM_BUILDINGS)}
+
+    # Symmetry breaking for buildings (by decreasing area, then by decreasing position)
+    for i in range(NUM_BUILDINGS-1):
+        add_lexicographic_greater_equal(model,
+                                        symmetry_key(buildings[i]),
+                                        symmetry_key(buildings[i+1]),
+                                        f"building_symmetry_{i}")
+
+    # Parking lots variables
+    parking_lots = {i: entity_2d(model, f"parking_lots_{i}", min_size=1, optional=True)
+                    for i in range(NUM_PARKING_LOTS)}
+
+    # Symmetry breaking for parking lots (by decreasing area, then by decreasing position)
+    for i in range(NUM_PARKING_LOTS-1):
+        add_lexicographic_greater_equal(model,
+                                        symmetry_key(parking_lots[i]),
+                                        symmetry_key(parking_lots[i+1]),
+                                        f"parking_lots_symmetry_{i}")
+
+    # Park variables (there is always a park, and it avoids both the floodable area and the utility
+    # pole)
+    park = entity_2d(model, "park", min_size=1, max_area=UNOBSTRUCTED_AREA)
+
+    # Floodable interval variable (only used by the redundant cumulative constraints)
+    floodable_interval = {"X": model.NewIntervalVar(FLOODABLE_X_START,
+                                                    FLOODABLE_X_SIZE,
+                                                    FLOODABLE_X_END,
+                                                    "floodable_interval_x"),
+                          "Y": model.NewIntervalVar(FLOODABLE_Y_START,
+                                                    FLOODABLE_Y_SIZE,
+                                                    FLOODABLE_Y_END,
+                                                    "floodable_interval_y")}
+
+    # The buildings, the parking lots, and the park cannot overlap
+    model.AddNoOverlap2D([buildings[i].x_interval for i in range(NUM_BUILDINGS)] +
+                         [parking_lots[i].x_interval for i in range(NUM_PARKING_LOTS)] +
+                         [park.x_interval],
+                         [buildings[i].y_interval for i in range(NUM_BUILDINGS)] +
+                         [parking_lots[i].y_interval for i in range(NUM_PARKING_LOTS)] +
+                         [park.y_interval])
+
+    # The floodable area cannot overlap with the buildings, the parking lots, or the park
+    for i in range(NUM_BUILDINGS):
+        add_no_overlap_with_obstacle(model, buildings[i],
+                                     FLOODABLE_X_START, FLOODABLE_X_END,
+                                     FLOODABLE_Y_START, FLOODABLE_Y_END,
+                                     f"building_{i}_floodable")
+    for i in range(NUM_PARKING_LOTS):
+        add_no_overlap_with_obstacle(model, parking_lots[i],
+                                     FLOODABLE_X_START, FLOODABLE_X_END,
+                                     FLOODABLE_Y_START, FLOODABLE_Y_END,
+                                     f"parking_lots_{i}_floodable")
+    add_no_overlap_with_obstacle(model, park,
+                                 FLOODABLE_X_START, FLOODABLE_X_END,
+                                 FLOODABLE_Y_START, FLOODABLE_Y_END,
+                                 "park_floodable")
+
+    # The utility pole cannot overlap with the buildings or the park
+    for i in range(NUM_BUILDINGS):
+        add_no_overlap_with_obstacle(model, buildings[i],
+                                     UTILITY_X_START, UTILITY_X_END,
+                                     UTILITY_Y_START, UTILITY_Y_END,
+                                     f"building_{i}_utility")
+    add_no_overlap_with_obstacle(model, park,
+                                 UTILITY_X_START, UTILITY_X_END,
+                                 UTILITY_Y_START, UTILITY_Y_END,
+                                 "park_utility")
+
+    # Redundant: the entities cannot occupy more than the area left around the floodable area (the
+    # parking lots may cover the utility pole, but the buildings and the park may not)
+    model.Add(cp_model.LinearExpr.Sum([buildings[i].area for i in range(NUM_BUILDINGS)] +
+                                      [parking_lots[i].area for i in range(NUM_PARKING_LOTS)] +
+                                      [park.area]) <=
+              UNFLOODED_AREA)
+    model.Add(cp_model.LinearExpr.Sum([buildings[i].area for i in range(NUM_BUILDINGS)] +
+                                      [park.area]) <=
+              UNOBSTRUCTED_AREA)
+
+    # Redundant: projected on each axis, the entities and the floodable area never stack higher
+    # than the lot
+    x_intervals = ([buildings[i].x_interval for i in range(NUM_BUILDINGS)] +
+                   [parking_lots[i].x_interval for i in range(NUM_PARKING_LOTS)] +
+                   [park.x_interval] +
+                   [floodable_interval["X"]])
+    y_intervals = ([buildings[i].y_interval for i in range(NUM_BUILDINGS)] +
+                   [parking_lots[i].y_interval for i in range(NUM_PARKING_LOTS)] +
+                   [park.y_interval] +
+                   [floodable_interval["Y"]])
+    x_sizes = ([buildings[i].x_size for i in range(NUM_BUILDINGS)] +
+               [parking_lots[i].x_size for i in range(NUM_PARKING_LOTS)] +
+               [park.x_size] +
+               [FLOODABLE_X_SIZE])
+    y_sizes = ([buildings[i].y_size for i in range(NUM_BUILDINGS)] +
+               [parking_lots[i].y_size for i in range(NUM_PARKING_LOTS)] +
+               [park.y_size] +
+               [FLOODABLE_Y_SIZE])
+    model.AddCumulative(x_intervals, y_sizes, SIZE_Y)
+    model.AddCumulative(y_intervals, x_sizes, SIZE_X)
+
+    # The combined areas of the parkings must be at least 10% the combined areas of the buildings
+    model.Add(cp_model.LinearExpr.Sum([parking_lots[i].area for i in range(NUM_PARKING_LOTS)]) * 10 >=
+              cp_model.LinearExpr.Sum([buildings[i].area for i in range(NUM_BUILDINGS)]))
+
+    # The area of the park must be at least as large as the area of the largest building (which is
+    # the first one, because of symmetry breaking)
+    model.Add(park.area >= buildings[0].area)
+
+    # The objective is to maximize the yield (building area)
+    lot_yield = model.NewIntVar(0, MAX_YIELD, "lot_yield")
+    model.Add(lot_yield == cp_model.LinearExpr.Sum([buildings[i].area for i in range(NUM_BUILDINGS)]))
+    model.Maximize(lot_yield)
+
+    return model, buildings, parking_lots, park, lot_yield
+
+
+def load_model(path):
+    """Return the same as `build_model`, from a model serialized to `path`.
+
+    The variables are recovered from the names given to them by `entity_2d` and `build_model`.
+    """
+    model = cp_model.CpModel()
+    with open(path, "rb") as f:
+        model.Proto().ParseFromString(f.read())
+
+    # The objective is serialized last, so a truncated file has none
+    if not model.Proto().HasField("objective"):
+        raise ValueError(f"{path} is truncated")
+
+    variables = {variable.name: model.GetIntVarFromProtoIndex(index)
+                 for index, variable in enumerate(model.Proto().variables)}
+    intervals = {constraint.name: model.GetIntervalVarFromProtoIndex(index)
+                 for index, constraint in enumerate(model.Proto().constraints)
+                 if constraint.HasField("interval")}
+
+    def entity(name):
+        return Entity2D(variables[f"{name}_x_start"],
+                        variables[f"{name}_x_size"],
+                        variables[f"{name}_x_end"],
+                        intervals[f"{name}_x_interval"],
+                        variables[f"{name}_y_start"],
+                        variables[f"{name}_y_size"],
+                        variables[f"{name}_y_end"],
+                        intervals[f"{name}_y_interval"],
+                        variables[f"{name}_area"],
+                        variables.get(f"{name}_present"))
+
+    buildings = {i: entity(f"building_{i}") for i in range(NUM_BUILDINGS)}
+    parking_lots = {i: entity(f"parking_lots_{i}") for i in range(NUM_PARKING_LOTS)}
+    park = entity("park")
+
+    return model, buildings, parking_lots, park, variables["lot_yield"]
+
+
+def is_fresh(path, reference):
+    """Return whether the file `path` exists and is more recent than the file `reference`."""
+    return os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(reference)
+
+
+def write_cache(path, data):
+    """Write `data` to the cache file `path`, so that an interrupted write never leaves a partial file.
+
+    The cache is only an optimization, so nothing is written if this fails (for example, in a
+    read-only directory).
+    """
+    temporary_path = f"{path}.tmp"
+    try:
+        with open(temporary_path, "wb") as f:
+            f.write(data)
+        os.replace(temporary_path, path)
+    except OSError:
+        if os.path.exists(temporary_path):
+            try:
+                os.remove(temporary_path)
+            except OSError:
+                pass
+
+
+def load_solution(path, model):
+    """Return the solution serialized to `path`, or None if it does not match `model`."""
+    response = cp_model.cp_model_pb2.CpSolverResponse()
+    with open(path, "rb") as f:
+        response.ParseFromString(f.read())
+    if len(response.solution) != len(model.Proto().variables):
+        return None
+    return response.solution
+
+
+# Reuse the serialized model, unless this script changed since it was serialized or the file is
+# unreadable
+model = None
+if is_fresh(MODEL_CACHE, __file__):
+    try:
+        model, buildings, parking_lots, park, lot_yield = load_model(MODEL_CACHE)
+    except (DecodeError, KeyError, OSError, ValueError):
+        model = None
+if model is None:
+    model, buildings, parking_lots, park, lot_yield = build_model()
+    write_cache(MODEL_CACHE, model.Proto().SerializeToString())
+
+# Warm start the solver with the previous solution of this model, or with a simple feasible layout
+previous_solution = None
+if is_fresh(SOLUTION_CACHE, MODEL_CACHE):
+    try:
+        previous_solution = load_solution(SOLUTION_CACHE, model)
+    except (DecodeError, OSError):
+        previous_solution = None
+if previous_solution is not None:
+    add_hint(model, dict(enumerate(previous_solution)))
+else:
+    layout = greedy_layout()
+    add_hint(model,
+             layout_hint(layout, buildings, parking_lots, park) |
+             {lot_yield.Index(): sum(x_size*y_size
+                                     for _, _, x_size, y_size in layout["buildings"].values())})
 
 # Solve the problem with a time limit
 solver = cp_model.CpSolver()
-solver.parameters.max_time_in_seconds = 5
+solver.parameters.max_time_in_seconds = TIME_LIMIT*YIELD_TIME_SHARE
+solver.parameters.num_search_workers = 8
+solver.parameters.log_search_progress = "--log" in sys.argv
 status = solver.Solve(model)
+response = solver.ResponseProto()
+
+# Keep the best yield found and pack the buildings toward the origin, so that the solver does not
+# spend its time enumerating equivalent layouts. This uses what is left of the time limit, starting
+# from the complete first solution, and the first solution is kept if no packed layout is found.
+solver.parameters.max_time_in_seconds = TIME_LIMIT - solver.WallTime()
+if status in (cp_model.OPTIMAL, cp_model.FEASIBLE) and solver.parameters.max_time_in_seconds > 0:
+    model.Add(lot_yield == solution_values(response)(lot_yield))
+    model.Minimize(cp_model.LinearExpr.Sum([buildings[i].x_start for i in range(NUM_BUILDINGS)] +
+                                           [buildings[i].y_start for i in range(NUM_BUILDINGS)]))
+    model.ClearHints()
+    add_hint(model, dict(enumerate(response.solution)))
+    if solver.Solve(model) in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        response = solver.ResponseProto()
+
 if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
     print("Model neither optimal nor feasible")
+    sys.exit(1)
+
+write_cache(SOLUTION_CACHE, response.SerializeToString())
+
+print(f"Yield: {solution_values(response)(lot_yield)}")
 
-print(f"Yield: {solver.Value(lot_yield)}")
-
-# Display results
-fig, ax = plt.subplots()
-plt.xlim([0, SIZE_X])
-plt.ylim([0, SIZE_Y])
-
-# Residential buildings
-for i in range(NUM_BUILDINGS):
-    ax.add_patch(Rectangle((solver.Value(buildings[i]["X"]["Start"]),
-                            solver.Value(buildings[i]["Y"]["Start"])),
-                           solver.Value(buildings[i]["X"]["Size"]),
-                           solver.Value(buildings[i]["Y"]["Size"]),
-                           edgecolor='black',
-                           facecolor='royalblue',
-                           fill=True,
-                           lw=3))
-
-# Parking lots
-for i in range(NUM_PARKING_LOTS):
-    ax.add_patch(Rectangle((solver.Value(parking_lots[i]["X"]["Start"]),
-                            solver.Value(parking_lots[i]["Y"]["Start"])),
-                           solver.Value(parking_lots[i]["X"]["Size"]),
-                           solver.Value(parking_lots[i]["Y"]["Size"]),
-                           edgecolor='black',
-                           facecolor='grey',
-                           fill=True,
-                           lw=3))
-
-# Park
-ax.add_patch(Rectangle((solver.Value(park["X"]["Start"]),
-                        solver.Value(park["Y"]["Start"])),
-                       solver.Value(park["X"]["Size"]),
-                       solver.Value(park["Y"]["Size"]),
-                       edgecolor='black',
-                       facecolor='limegreen',
-                       fill=True,
-                       lw=3))
-
-# Floodable area
-ax.add_patch(Rectangle((FLOODABLE_X_START,
-                        FLOODABLE_Y_START),
-                       FLOODABLE_X_SIZE,
-                       FLOODABLE_Y_SIZE,
-                       edgecolor='black',
-                       facecolor='red',
-                       fill=True,
-                       lw=3))
-
-# Utility pole
-ax.add_patch(Rectangle((UTILITY_X_START,
-                        UTILITY_Y_START),
-                       UTILITY_X_SIZE,
-                       UTILITY_Y_SIZE,
-                       edgecolor='black',
-                       facecolor='orange',
-                       fill=True,
-                       lw=3))
-
-plt.show()
+# Display the results
+if "--plot" in sys.argv:
+    plot_solution(response, buildings, parking_lots, park)
+if "--save" in sys.argv:
+    plot_solution(response, buildings, parking_lots, park, filename=PLOT_FILE)